@@ -1 +1,4 @@
 from .api import *
+from .hub import OddsHub, OddsHubSubscriber
+from .snapshots import SnapshotStore
+from .archive import normalize_archive
@@ -1,8 +1,9 @@
 import requests
-import pandas as pd
 from bs4 import BeautifulSoup
 import logging
 
+from . import markets
+
 # logging.getLogger("requests").setLevel(logging.WARNING)
 
 
@@ -45,12 +46,43 @@ class TheOddsAPI(object):
             response = requests.get(
                 host + endpoint, params=params)
             response.raise_for_status()
+            self._record_usage(response)
             return response.json()
         except requests.exceptions.HTTPError as e:
             raise e
 
-    def __init__(self, api_key: str):
+    def _record_usage(self, response):
+        """Helper function to keep the usage quota reported by the last response
+
+        Parameters
+        ----------
+        response : Response
+            Response from The Odds API server
+        """
+        headers = response.headers
+        if 'x-requests-remaining' in headers:
+            self.requests_remaining = int(float(headers['x-requests-remaining']))
+        if 'x-requests-used' in headers:
+            self.requests_used = int(float(headers['x-requests-used']))
+
+    def __init__(self, api_key: str, validate_markets: bool = True):
+        """
+        Parameters
+        ----------
+        api_key : str
+            Key received upon signing up for a subscription plan
+        validate_markets : bool, optional
+            Check the markets of each request against the market registry
+            before sending it, so requests for markets not available from
+            the endpoint or sport do not use the quota. Unknown markets are
+            only logged by get_event_odds. By default True.
+        """
         self.api_key = api_key
+        self.validate_markets = validate_markets
+        # Usage quota as of the last request made by this client, None until
+        # the first request
+        self.requests_remaining = None
+        self.requests_used = None
 
     def get_sports(self, all: str = 'false'):
         """Get list of available sports and tournaments
@@ -133,6 +165,8 @@ class TheOddsAPI(object):
         params = kwargs
         sport = params['sport']
         del params['sport']
+        if self.validate_markets and 'markets' in params:
+            markets.validate_markets(params['markets'], sport=sport)
         endpoint = f'/v4/sports/{sport}/odds'
         odds_response = self._get(TheOddsAPI.HOST, endpoint, params)
         return odds_response
@@ -198,6 +232,8 @@ class TheOddsAPI(object):
         params = kwargs
         sport = params['sport']
         del params['sport']
+        if self.validate_markets and 'markets' in params:
+            markets.validate_markets(params['markets'], sport=sport)
         # Create the endpoint from the kwargs
         endpoint = f'/v4/sports/{sport}/odds-history/'
 
@@ -233,6 +269,8 @@ class TheOddsAPI(object):
         event_id = params['eventId']
         del params['sport']
         del params['eventId']
+        if self.validate_markets and 'markets' in params:
+            markets.validate_markets(params['markets'], event=True, sport=sport)
         # Create the endpoint from the kwargs
         endpoint = f'/v4/sports/{sport}/events/{event_id}/odds/'
         event_odds_response = self._get(
@@ -251,21 +289,7 @@ class TheOddsAPI(object):
             Dataframe of featured betting markets listed at
              https://the-odds-api.com/sports-odds-data/betting-markets.html
         """
-        featured_betting_markets_dict = {
-            'market_key': ['h2h', 'spreads', 'totals', 'outrights', 'h2h_lay', 'outrights_lay'],
-            'market_names': ['Head to head, Moneyline', 'Points spread, Handicap',
-                             'Total points/goals, Over/Under', 'Outrights, Futures',
-                             'Head to head, Moneyline', 'Outrights, Futures'],
-            'description': [
-                'Bet on the winning team or player of a game (includes the draw for soccer)',
-                'The spreads market as featured by a bookmaker. Bet on the winning team after a points handicap has been applied to each team',
-                'The totals market as featured by a bookmaker. Bet on the total score of the game being above or below a threshold',
-                'Bet on a final outcome of a tournament or competition',
-                'Bet against a h2h outcome. This market is only applicable to betting exchanges',
-                'Bet against an outrights outcome. This market is only applicable to betting exchanges'
-            ]
-        }
-        return pd.DataFrame(featured_betting_markets_dict)
+        return markets.markets_frame('featured')
 
     @staticmethod
     def get_additional_markets():
@@ -280,19 +304,7 @@ class TheOddsAPI(object):
             Dataframe of additional betting markets listed at
             https://the-odds-api.com/sports-odds-data/betting-markets.html#additional-markets
         """
-        additional_markets_dict = {
-            'market_key': ['alternate_spreads', 'alternate_totals', 'btts', 'draw_no_bet', 'h2h_3_way'],
-            'market_name': ['Alternate Spreads (handicap)', 'Alternate Totals (Over/Under)',
-                            'Both Teams to Score', 'Draw No Bet', 'Head to head / Moneyline 3 way'],
-            'description': [
-                'All available point spread outcomes for each team',
-                'All available over/under outcomes',
-                'Odds that both teams will score during the game. Outcomes are "Yes" or "No". Available for soccer.',
-                'Odds for the match winner, excluding the draw outcome. A draw will result in a returned bet. Available for soccer',
-                'Match winner including draw'
-            ]
-        }
-        return pd.DataFrame(additional_markets_dict)
+        return markets.markets_frame('additional')
 
     @staticmethod
     def get_player_props(sport: str):
@@ -304,8 +316,8 @@ class TheOddsAPI(object):
         Parameters
         ----------
         sport : str
-            Sport key for which to return games and odds. Obtained from the
-             /sports endpoint
+            League ('NFL', 'NBA', 'NHL' or 'MLB') or sport key (e.g.
+            'basketball_nba') for which to return player props
 
         Returns
         -------
@@ -313,60 +325,7 @@ class TheOddsAPI(object):
             Dataframe of player props listed at
             https://the-odds-api.com/sports-odds-data/betting-markets.html#player-props-api-markets
         """
-        if sport == 'NFL':
-            player_props_dict = {
-                'market_key': [
-                    'player_pass_tds',
-                    'player_pass_yds',
-                    'player_pass_completions',
-                    'player_pass_attempts',
-                    'player_pass_interceptions',
-                    'player_pass_longest_completion',
-                    'player_rush_yds',
-                    'player_rush_attempts',
-                    'player_rush_longest',
-                    'player_receptions',
-                    'player_reception_yds',
-                    'player_reception_longest'
-                ],
-                'market_name': [
-                    'Pass Touchdowns (Over/Under)',
-                    'Pass Yards (Over/Under)',
-                    'Pass Completions (Over/Under)',
-                    'Pass Attempts (Over/Under)',
-                    'Pass Intercepts (Over/Under)',
-                    'Pass Longest Completion (Over/Under)',
-                    'Rush Yards (Over/Under)',
-                    'Rush Attempts (Over/Under)',
-                    'Longest Rush (Over/Under)',
-                    'Receptions (Over/Under)',
-                    'Reception Yards (Over/Under)',
-                    'Longest Reception (Over/Under)'
-                ]
-            }
-        elif sport == 'NBA':
-            market_key_arr = [
-                'player_points'
-                'player_rebounds',
-                'player_assists',
-                'player_threes',
-                'player_double_double',
-                'player_blocks',
-                'player_steals',
-                'player_turnovers'
-            ]
-            market_name_arr = [mk.split("_")[1].capitalize(
-            ) + " (Over/Under)" for mk in market_key_arr]
-            player_props_dict = {
-                'market_key': market_key_arr,
-                'market_name': market_name_arr
-            }
-        elif sport == 'NHL':
-            market_key_arr = [
-                'player_points'
-            ]
-        return pd.DataFrame(player_props_dict)
-    import requests
+        return markets.markets_frame('player_props', sport)
 
     @staticmethod
     def _get_bookmakers_helper(region_index: int):
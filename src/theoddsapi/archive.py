@@ -0,0 +1,248 @@
+import gzip
+import heapq
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .normalize import normalize_odds, ODDS_COLUMNS
+from .writers import TableWriter, FORMATS
+
+# File name patterns of stored get_historical_odds responses
+ARCHIVE_SUFFIXES = ('.json', '.json.gz')
+# Rows a worker buffers in total before writing out its largest partition
+CHUNK_ROWS = 100000
+# Stages timed by normalize_archive, in pipeline order
+STAGES = ['read', 'parse', 'normalize', 'write', 'merge']
+
+
+def _find_archive_files(source: str):
+    """Helper function to list stored responses with their sizes
+
+    Returns
+    -------
+    list[tuple]
+        (path, size in bytes) of every archive file under source
+    """
+    found = []
+    for root, _, files in os.walk(source):
+        for name in files:
+            if name.endswith(ARCHIVE_SUFFIXES):
+                path = os.path.join(root, name)
+                found.append((path, os.path.getsize(path)))
+    return sorted(found)
+
+
+def _shard(files: list, shards: int):
+    """Helper function to split files into shards of about the same size
+
+    Largest files are placed first, each into the currently smallest shard.
+    """
+    heap = [(0, i, []) for i in range(shards)]
+    for path, size in sorted(files, key=lambda f: -f[1]):
+        total, i, paths = heapq.heappop(heap)
+        paths.append(path)
+        heapq.heappush(heap, (total + size, i, paths))
+    return [sorted(paths) for _, _, paths in sorted(heap, key=lambda s: s[1]) if paths]
+
+
+def _partition(row: dict):
+    """Helper function giving the partition directory of a row"""
+    timestamp = row['snapshot_timestamp']
+    date = timestamp[:10] if isinstance(timestamp, str) else 'unknown'
+    return os.path.join(f"sport_key={row['sport_key']}", f'date={date}')
+
+
+def _normalize_shard(shard_id: int, paths: list, output: str, format: str,
+                     chunk_rows: int):
+    """Normalize one shard of archive files in a worker process
+
+    Rows are buffered as columns per partition. Whenever the buffers hold
+    chunk_rows rows in total, the largest one is written as
+    <partition>/part-<shard>-<chunk>.<ext>, so a worker never holds more
+    than chunk_rows rows however many partitions its files touch.
+
+    Returns
+    -------
+    dict
+        Number of files, bytes and rows processed, the (path, error) of
+        every file that could not be normalized and the seconds spent in
+        each stage
+    """
+    stats = {'files': 0, 'bytes': 0, 'rows': 0, 'failed_files': [],
+             'seconds': dict.fromkeys(STAGES, 0.0)}
+    seconds = stats['seconds']
+    buffers = {}
+    buffered = 0
+    chunks = 0
+
+    def flush(partition):
+        nonlocal buffered, chunks
+        start = time.perf_counter()
+        path = os.path.join(output, partition,
+                            f'part-{shard_id:05d}-{chunks:04d}.{FORMATS[format]}')
+        columns = buffers.pop(partition)
+        with TableWriter(path, format, ODDS_COLUMNS) as writer:
+            writer.write_columns(columns)
+        buffered -= len(columns[ODDS_COLUMNS[0]])
+        chunks += 1
+        seconds['write'] += time.perf_counter() - start
+
+    for path in paths:
+        # A damaged file is recorded and skipped rather than failing the run
+        try:
+            start = time.perf_counter()
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rb') as f:
+                raw = f.read()
+            seconds['read'] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            response = json.loads(raw)
+            seconds['parse'] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            rows = normalize_odds(response)
+        except Exception as e:
+            stats['failed_files'].append((path, f'{type(e).__name__}: {e}'))
+            continue
+        for row in rows:
+            partition = _partition(row)
+            if partition not in buffers:
+                buffers[partition] = {column: [] for column in ODDS_COLUMNS}
+            columns = buffers[partition]
+            for column in ODDS_COLUMNS:
+                columns[column].append(row[column])
+        buffered += len(rows)
+        seconds['normalize'] += time.perf_counter() - start
+
+        stats['files'] += 1
+        stats['bytes'] += len(raw)
+        stats['rows'] += len(rows)
+        while buffered >= chunk_rows:
+            flush(max(buffers, key=lambda p: len(buffers[p][ODDS_COLUMNS[0]])))
+
+    for partition in list(buffers):
+        flush(partition)
+    return stats
+
+
+def _merge_partition(directory: str, format: str):
+    """Merge the part files of one partition into a single file
+
+    Parts are streamed one at a time, so memory use is bounded by the size
+    of a single part.
+
+    Returns
+    -------
+    float
+        Seconds spent merging
+    """
+    start = time.perf_counter()
+    extension = FORMATS[format]
+    parts = sorted(name for name in os.listdir(directory)
+                   if name.startswith('part-') and name.endswith('.' + extension))
+    merged = os.path.join(directory, f'data.{extension}')
+    if format == 'parquet':
+        import pyarrow.parquet as pq
+        writer = None
+        for name in parts:
+            table = pq.read_table(os.path.join(directory, name))
+            if writer is None:
+                writer = pq.ParquetWriter(merged + '.part', table.schema)
+            writer.write_table(table)
+        writer.close()
+        os.replace(merged + '.part', merged)
+    else:
+        with open(merged + '.part', 'wb') as out:
+            for i, name in enumerate(parts):
+                with open(os.path.join(directory, name), 'rb') as f:
+                    if format == 'csv' and i > 0:
+                        # Keep the header of the first part only
+                        f.readline()
+                    shutil.copyfileobj(f, out)
+        os.replace(merged + '.part', merged)
+    for name in parts:
+        os.remove(os.path.join(directory, name))
+    return time.perf_counter() - start
+
+
+def normalize_archive(source: str, output: str, format: str = 'csv',
+                      workers: int = None, chunk_rows: int = CHUNK_ROWS):
+    """Turn a directory of stored get_historical_odds responses into one
+    partitioned table of normalized odds rows
+
+    Files (*.json or *.json.gz, one response each) are split into shards of
+    about the same total size and normalized in a process pool. Each worker
+    writes its rows as part files under
+    output/sport_key=<sport>/date=<YYYY-MM-DD>/, then the parts of every
+    partition are merged into a single data.<ext> file, also in parallel.
+    Rows within a partition are not sorted. Files that cannot be read or
+    parsed are skipped and listed in the returned statistics.
+
+    Parameters
+    ----------
+    source : str
+        Directory searched recursively for stored responses
+    output : str
+        Directory of the partitioned dataset. Must not already hold one.
+    format : str, optional
+        One of 'csv', 'ndjson' or 'parquet', by default 'csv'
+    workers : int, optional
+        Number of worker processes, by default the number of CPUs
+    chunk_rows : int, optional
+        Rows a worker buffers across all partitions before writing, by
+        default 100000
+
+    Returns
+    -------
+    dict
+        Number of files, bytes, rows and partitions, the (path, error) of
+        every file that was skipped because it could not be read or
+        normalized, the wall clock seconds of the whole run, the seconds
+        spent in each stage summed over all workers, and the throughput of
+        each stage in units per second of stage time (bytes for read and
+        parse, rows for the other stages)
+    """
+    if format not in FORMATS:
+        raise ValueError(
+            f'Invalid format: {format}. Valid formats are: {list(FORMATS)}')
+    if os.path.isdir(output) and os.listdir(output):
+        raise ValueError(f'Output directory is not empty: {output}')
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    files = _find_archive_files(source)
+    # More shards than workers so a slow shard does not hold up the run
+    shards = _shard(files, 4 * workers)
+
+    stats = {'files': 0, 'bytes': 0, 'rows': 0, 'failed_files': [],
+             'seconds': dict.fromkeys(STAGES, 0.0)}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_normalize_shard, i, paths, output, format, chunk_rows)
+                   for i, paths in enumerate(shards)]
+        for future in futures:
+            shard_stats = future.result()
+            for key in ('files', 'bytes', 'rows'):
+                stats[key] += shard_stats[key]
+            stats['failed_files'].extend(shard_stats['failed_files'])
+            for stage, seconds in shard_stats['seconds'].items():
+                stats['seconds'][stage] += seconds
+
+        partitions = []
+        if os.path.isdir(output):
+            partitions = sorted(root for root, dirs, _ in os.walk(output) if not dirs
+                                and os.path.basename(root).startswith('date='))
+        for seconds in pool.map(_merge_partition, partitions,
+                                [format] * len(partitions)):
+            stats['seconds']['merge'] += seconds
+
+    stats['partitions'] = len(partitions)
+    stats['wall_seconds'] = time.perf_counter() - started
+    units = {'read': 'bytes', 'parse': 'bytes', 'normalize': 'rows',
+             'write': 'rows', 'merge': 'rows'}
+    stats['throughput'] = {
+        stage: stats[units[stage]] / seconds if seconds else None
+        for stage, seconds in stats['seconds'].items()
+    }
+    return stats
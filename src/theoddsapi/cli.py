@@ -0,0 +1,304 @@
+"""
+Command line tool exporting odds, scores and historical odds for many sports
+at once, and normalizing archives of stored historical odds. Run
+`theoddsapi --help` for usage.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .api import TheOddsAPI
+from .archive import normalize_archive
+from .markets import validate_markets
+from .normalize import normalize_odds, normalize_scores, ODDS_COLUMNS, SCORES_COLUMNS
+from .writers import TableWriter, FORMATS
+
+# Environment variable holding the API key when --api-key is not passed
+API_KEY_ENV = 'THEODDSAPI_API_KEY'
+# File in the output directory listing the exports already completed
+STATE_FILE = '.export-state'
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def _parse_date(value: str):
+    try:
+        return datetime.datetime.strptime(value, DATE_FORMAT)
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f'Invalid date: {value}. Expected ISO 8601 such as 2023-01-01T12:00:00Z')
+
+
+def _build_parser():
+    parser = argparse.ArgumentParser(
+        prog='theoddsapi',
+        description='Export odds, scores and historical odds from The Odds API.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--sports', required=True,
+                        help='Comma delimited list of sport keys, e.g. basketball_nba,icehockey_nhl')
+    common.add_argument('--api-key', default=os.environ.get(API_KEY_ENV),
+                        help=f'API key, by default read from ${API_KEY_ENV}')
+    common.add_argument('--output', '-o', default='.',
+                        help='Directory to export to, by default the current directory')
+    common.add_argument('--format', '-f', choices=list(FORMATS), default='csv',
+                        help='Output format, by default csv')
+    common.add_argument('--workers', '-j', type=int, default=4,
+                        help='Number of requests made in parallel, by default 4')
+    common.add_argument('--resume', action='store_true',
+                        help='Skip the exports completed by a previous interrupted run')
+
+    markets = argparse.ArgumentParser(add_help=False)
+    markets.add_argument('--regions', default='us',
+                         help='Which bookmakers to appear in the response, by default us')
+    markets.add_argument('--markets', default='h2h',
+                         help='Comma delimited list of markets, by default h2h')
+    markets.add_argument('--bookmakers',
+                         help='Comma delimited list of bookmakers, overrides --regions')
+    markets.add_argument('--odds-format', choices=['decimal', 'american'], default='decimal',
+                         help='Format of the odds, by default decimal')
+    markets.add_argument('--no-validate-markets', action='store_true',
+                         help='Send --markets without checking it against the market registry')
+
+    subparsers.add_parser('odds', parents=[common, markets],
+                          help='Export upcoming and live odds')
+    scores = subparsers.add_parser('scores', parents=[common],
+                                   help='Export live, upcoming and recent scores')
+    scores.add_argument('--days-from', type=int, choices=[1, 2, 3],
+                        help='Include games completed up to this many days ago')
+    history = subparsers.add_parser('history', parents=[common, markets],
+                                    help='Export historical odds snapshots over a date range')
+    history.add_argument('--start', type=_parse_date, required=True,
+                         help='First snapshot, e.g. 2023-01-01T00:00:00Z')
+    history.add_argument('--end', type=_parse_date, required=True,
+                         help='Last snapshot, e.g. 2023-01-31T23:55:00Z')
+    history.add_argument('--interval', type=int, default=5,
+                         help='Minutes between two snapshots, by default 5')
+
+    archive = subparsers.add_parser(
+        'normalize', help='Normalize a directory of stored historical odds responses')
+    archive.add_argument('source',
+                         help='Directory of get_historical_odds responses (*.json or *.json.gz)')
+    archive.add_argument('--output', '-o', required=True,
+                         help='Empty directory to write the partitioned dataset to')
+    archive.add_argument('--format', '-f', choices=list(FORMATS), default='csv',
+                         help='Output format, by default csv')
+    archive.add_argument('--workers', '-j', type=int,
+                         help='Number of worker processes, by default the number of CPUs')
+    return parser
+
+
+def _request_params(args):
+    """Helper function giving the request parameters shared by all exports"""
+    params = {}
+    if args.command in ('odds', 'history'):
+        params = {'markets': args.markets, 'oddsFormat': args.odds_format}
+        if args.bookmakers:
+            params['bookmakers'] = args.bookmakers
+        else:
+            params['regions'] = args.regions
+    elif args.days_from is not None:
+        params = {'daysFrom': args.days_from}
+    return params
+
+
+def _tasks(args):
+    """Helper function to list the exports to make
+
+    Yields
+    ------
+    tuple
+        (task_id, kind, params) where task_id is also the output path
+        relative to the output directory, without extension
+    """
+    params = _request_params(args)
+    for sport in args.sports.split(','):
+        if args.command != 'history':
+            yield f'{args.command}/{sport}', args.command, dict(params, sport=sport)
+            continue
+        date = args.start
+        while date <= args.end:
+            yield (f"history/{sport}/{date.strftime('%Y%m%dT%H%M%SZ')}", 'history',
+                   dict(params, sport=sport, date=date.strftime(DATE_FORMAT)))
+            date += datetime.timedelta(minutes=args.interval)
+
+
+def _fetch(client, kind: str, params: dict):
+    """Helper function run by the worker threads to fetch and normalize"""
+    if kind == 'odds':
+        rows = normalize_odds(client.get_odds(**params),
+                              timestamp=time.strftime(DATE_FORMAT, time.gmtime()))
+    elif kind == 'scores':
+        rows = normalize_scores(client.get_scores(**params))
+    else:
+        rows = normalize_odds(client.get_historical_odds(**params))
+    return rows
+
+
+def export(client, args, log=sys.stderr):
+    """Run an export described by parsed command line arguments
+
+    At most two requests per worker are in flight at any time and each
+    result is written to its own file as soon as it arrives, so memory use
+    does not grow with the number of sports or snapshots.
+
+    Parameters
+    ----------
+    client : TheOddsAPI
+        Client used for every request
+    args : argparse.Namespace
+        Parsed command line arguments
+    log : file, optional
+        Where progress is reported, by default stderr
+
+    Returns
+    -------
+    int
+        Number of exports that failed
+    """
+    os.makedirs(args.output, exist_ok=True)
+    state_path = os.path.join(args.output, STATE_FILE)
+    # The first line of the state file records the settings of the run, so
+    # an export is never resumed with different markets, regions or format
+    settings = json.dumps(dict(_request_params(args), command=args.command,
+                               format=args.format), sort_keys=True)
+    done = set()
+    resuming = args.resume and os.path.exists(state_path)
+    if resuming:
+        with open(state_path) as f:
+            previous = f.readline().strip()
+            done = {line.strip() for line in f if line.strip()}
+        if previous != settings:
+            raise ValueError(
+                f'Cannot resume, the export in {args.output} was made with different '
+                f'settings: {previous}. Rerun without --resume or use another output directory')
+    tasks = [task for task in _tasks(args) if task[0] not in done]
+    total = len(tasks)
+    if done:
+        print(f'Resuming, skipping {len(done)} completed exports', file=log)
+
+    columns = SCORES_COLUMNS if args.command == 'scores' else ODDS_COLUMNS
+    pending = iter(tasks)
+    failed = 0
+    rows_written = 0
+    completed = 0
+    with open(state_path, 'a' if resuming else 'w') as state, \
+            ThreadPoolExecutor(max_workers=args.workers) as pool:
+        if not resuming:
+            state.write(settings + '\n')
+            state.flush()
+        in_flight = {}
+
+        def submit_next():
+            task = next(pending, None)
+            if task is not None:
+                future = pool.submit(_fetch, client, task[1], dict(task[2]))
+                in_flight[future] = task
+
+        for _ in range(2 * args.workers):
+            submit_next()
+        try:
+            while in_flight:
+                finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    task_id = in_flight.pop(future)[0]
+                    completed += 1
+                    try:
+                        rows = future.result()
+                        path = os.path.join(
+                            args.output, f'{task_id}.{FORMATS[args.format]}')
+                        with TableWriter(path, args.format, columns) as writer:
+                            writer.write(rows)
+                    except Exception as e:
+                        failed += 1
+                        print(f'[{completed}/{total}] {task_id}: failed: {e}', file=log)
+                    else:
+                        rows_written += len(rows)
+                        state.write(task_id + '\n')
+                        state.flush()
+                        print(f'[{completed}/{total}] {task_id}: {len(rows)} rows, '
+                              f'{client.requests_remaining} requests remaining', file=log)
+                    submit_next()
+        except KeyboardInterrupt:
+            for future in in_flight:
+                future.cancel()
+            print('Interrupted, rerun with --resume to continue', file=log)
+            raise
+
+    print(f'Exported {completed - failed} of {total} ({rows_written} rows), {failed} failed. '
+          f'Requests used: {client.requests_used}, '
+          f'remaining: {client.requests_remaining}', file=log)
+    if failed:
+        print('Rerun with --resume to retry the failed exports', file=log)
+    return failed
+
+
+def _report(stats, log=sys.stderr):
+    """Helper function to print the statistics of normalize_archive"""
+    print(f"Normalized {stats['files']} files ({stats['bytes'] / 1e6:.1f} MB) into "
+          f"{stats['rows']} rows in {stats['partitions']} partitions "
+          f"in {stats['wall_seconds']:.1f}s", file=log)
+    units = {'read': 'MB', 'parse': 'MB', 'normalize': 'rows',
+             'write': 'rows', 'merge': 'rows'}
+    for stage, seconds in stats['seconds'].items():
+        throughput = stats['throughput'][stage]
+        if throughput is None:
+            continue
+        if units[stage] == 'MB':
+            throughput /= 1e6
+        print(f'  {stage:<10} {seconds:8.1f}s {throughput:14,.1f} {units[stage]}/s',
+              file=log)
+    if stats['failed_files']:
+        print(f"Skipped {len(stats['failed_files'])} files that could not be normalized:",
+              file=log)
+        for path, error in stats['failed_files']:
+            print(f'  {path}: {error}', file=log)
+
+
+def main(argv=None):
+    """Entry point of the theoddsapi command"""
+    parser = _build_parser()
+    args = parser.parse_args(argv)
+    if args.workers is not None and args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.format == 'parquet':
+        try:
+            import pyarrow
+        except ImportError:
+            parser.error('parquet output requires pyarrow, install it with: pip install theoddsapi[parquet]')
+    if args.command == 'normalize':
+        try:
+            stats = normalize_archive(args.source, args.output, format=args.format,
+                                      workers=args.workers)
+        except ValueError as e:
+            parser.error(str(e))
+        _report(stats)
+        return 1 if stats['failed_files'] else 0
+    if not args.api_key:
+        parser.error(f'an API key is required, pass --api-key or set ${API_KEY_ENV}')
+    if args.command == 'history':
+        if args.interval < 1:
+            parser.error('--interval must be at least 1')
+        if args.start > args.end:
+            parser.error('--start must not be after --end')
+    if args.command in ('odds', 'history') and not args.no_validate_markets:
+        # Fail before any request rather than once per sport and snapshot
+        for sport in args.sports.split(','):
+            try:
+                validate_markets(args.markets, sport=sport)
+            except ValueError as e:
+                parser.error(str(e))
+    try:
+        client = TheOddsAPI(args.api_key,
+                            validate_markets=not getattr(args, 'no_validate_markets', False))
+        failed = export(client, args)
+    except KeyboardInterrupt:
+        return 130
+    except ValueError as e:
+        parser.error(str(e))
+    return 1 if failed else 0
@@ -0,0 +1,389 @@
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import stat
+import threading
+import time
+
+from .markets import validate_markets
+from .normalize import normalize_odds, normalize_scores, filter_rows
+
+logger = logging.getLogger(__name__)
+
+
+# socketserver only defines UnixStreamServer where Unix sockets exist, which
+# excludes Windows. Importing this module must still work there.
+if hasattr(socket, 'AF_UNIX'):
+    class _HubServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+        def __init__(self, socket_path, hub):
+            self.hub = hub
+            super().__init__(socket_path, _SubscriberHandler)
+else:
+    _HubServer = None
+
+
+class _SubscriberHandler(socketserver.StreamRequestHandler):
+    """Streams hub messages to one local subscriber
+
+    The subscriber sends a single JSON line with its filters on connect and
+    then only reads. Messages are written as newline delimited JSON.
+    """
+
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            filters = json.loads(line) if line.strip() else {}
+        except ValueError:
+            logger.warning('Dropping subscriber with invalid filters: %r', line)
+            return
+        outbox = self.server.hub._subscribe(filters)
+        try:
+            while True:
+                message = outbox.get()
+                if message is None:
+                    break
+                self.wfile.write(message)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            self.server.hub._unsubscribe(outbox)
+
+
+class OddsHub(object):
+    """
+    Owns a single TheOddsAPI client, polls a fixed list of feeds on a schedule
+    and republishes the normalized rows to local subscribers over a Unix
+    socket, so that many processes on a host share one feed and one quota.
+
+    Every subscriber receives a snapshot of the current rows of all feeds on
+    connect, followed by one update message each time a feed's rows change.
+    An update replaces all rows of that feed. Unix sockets are only available
+    on POSIX systems.
+    """
+
+    # Maximum number of messages queued for a subscriber before it is
+    # considered too slow and disconnected
+    MAX_PENDING = 100
+
+    def __init__(self, client, feeds: list, socket_path: str, interval: float = 60):
+        """
+        Parameters
+        ----------
+        client : TheOddsAPI
+            Client used for every request made by the hub
+        feeds : list[dict]
+            Feeds to poll. Each feed is a dict with a 'kind' of 'odds' or
+            'scores' and the keyword arguments passed to get_odds or
+            get_scores, e.g. {'kind': 'odds', 'sport': 'basketball_nba',
+            'regions': 'us', 'markets': 'h2h'}
+        socket_path : str
+            Path of the Unix socket subscribers connect to
+        interval : float, optional
+            Seconds between two polls of all feeds, by default 60
+        """
+        for feed in feeds:
+            if feed.get('kind') not in ('odds', 'scores'):
+                raise ValueError(
+                    f"Invalid feed kind: {feed.get('kind')}. Valid kinds are: ['odds', 'scores']")
+            if feed['kind'] == 'odds' and 'markets' in feed and \
+                    getattr(client, 'validate_markets', True):
+                validate_markets(feed['markets'], sport=feed.get('sport'))
+        names = [OddsHub.feed_name(feed) for feed in feeds]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f'Duplicate feeds: {duplicates}')
+        self.client = client
+        self.feeds = feeds
+        self.socket_path = socket_path
+        self.interval = interval
+        self._rows = {}
+        self._seq = 0
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._server = None
+        self._socket_id = None
+        self._threads = []
+
+    @staticmethod
+    def feed_name(feed: dict):
+        """Name identifying a feed in the messages sent to subscribers
+
+        Built from every parameter of the feed, e.g.
+        'odds:basketball_nba?markets=h2h&regions=us', so that feeds for the
+        same sport with different markets, regions or bookmakers are kept
+        apart.
+        """
+        name = f"{feed['kind']}:{feed['sport']}"
+        params = sorted((k, v) for k, v in feed.items() if k not in ('kind', 'sport'))
+        if params:
+            name += '?' + '&'.join(f'{k}={v}' for k, v in params)
+        return name
+
+    def _fetch(self, feed: dict):
+        """Helper function to request and normalize a single feed"""
+        # Copy because the client methods consume their kwargs
+        params = {k: v for k, v in feed.items() if k != 'kind'}
+        if feed['kind'] == 'odds':
+            return normalize_odds(self.client.get_odds(**params),
+                                  timestamp=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()))
+        return normalize_scores(self.client.get_scores(**params))
+
+    def poll(self):
+        """Poll every feed once and publish the feeds whose rows changed"""
+        for feed in self.feeds:
+            name = OddsHub.feed_name(feed)
+            try:
+                rows = self._fetch(feed)
+            except Exception:
+                logger.exception('Failed to poll feed %s', name)
+                continue
+            # Keep polling the other feeds, and keep the poll thread alive
+            try:
+                self._publish(name, rows)
+            except Exception:
+                logger.exception('Failed to publish feed %s', name)
+
+    @staticmethod
+    def _strip_timestamp(rows):
+        return [{k: v for k, v in row.items() if k != 'snapshot_timestamp'}
+                for row in rows]
+
+    def _publish(self, name: str, rows: list):
+        """Helper function to store a feed's rows and fan them out"""
+        with self._lock:
+            previous = self._rows.get(name)
+            # The snapshot timestamp changes on every poll, so ignore it when
+            # deciding whether subscribers need an update
+            if previous is not None and \
+                    OddsHub._strip_timestamp(previous) == OddsHub._strip_timestamp(rows):
+                return
+            self._rows[name] = rows
+            self._seq += 1
+            for outbox, filters in list(self._subscribers.items()):
+                message = {
+                    'type': 'update',
+                    'seq': self._seq,
+                    'feed': name,
+                    'rows': filter_rows(rows, **filters)
+                }
+                self._send(outbox, message)
+
+    def _send(self, outbox, message):
+        """Helper function to queue a message, dropping slow subscribers"""
+        try:
+            outbox.put_nowait((json.dumps(message) + '\n').encode())
+        except queue.Full:
+            logger.warning('Disconnecting slow subscriber')
+            del self._subscribers[outbox]
+            OddsHub._hang_up(outbox)
+
+    @staticmethod
+    def _hang_up(outbox):
+        """Helper function to tell a subscriber's handler to disconnect"""
+        try:
+            outbox.put_nowait(None)
+        except queue.Full:
+            # Make room for the sentinel, the subscriber is leaving anyway.
+            # Its handler may have drained the queue in the meantime.
+            try:
+                outbox.get_nowait()
+            except queue.Empty:
+                pass
+            outbox.put_nowait(None)
+
+    def _subscribe(self, filters: dict):
+        """Helper function to register a subscriber
+
+        The snapshot is queued under the same lock used to publish updates,
+        so a subscriber sees every update made after its snapshot and none
+        made before it.
+        """
+        filters = {k: filters.get(k)
+                   for k in ('sports', 'markets', 'bookmakers')}
+        outbox = queue.Queue(maxsize=OddsHub.MAX_PENDING)
+        with self._lock:
+            self._subscribers[outbox] = filters
+            message = {
+                'type': 'snapshot',
+                'seq': self._seq,
+                'feeds': {name: filter_rows(rows, **filters)
+                          for name, rows in self._rows.items()}
+            }
+            self._send(outbox, message)
+        return outbox
+
+    def _unsubscribe(self, outbox):
+        with self._lock:
+            self._subscribers.pop(outbox, None)
+
+    def _poll_forever(self):
+        while not self._stop.is_set():
+            self.poll()
+            self._stop.wait(self.interval)
+
+    @staticmethod
+    def _file_id(path: str):
+        """Helper function giving (device, inode) of path, None if missing"""
+        try:
+            st = os.lstat(path)
+        except FileNotFoundError:
+            return None
+        return st.st_dev, st.st_ino
+
+    @staticmethod
+    def _remove_stale_socket(path: str):
+        """Helper function to remove a socket left behind by a hub that exited
+
+        Raises
+        ------
+        FileExistsError
+            If path is not a socket, or a running hub still accepts
+            connections on it
+        """
+        try:
+            mode = os.lstat(path).st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise FileExistsError(f'{path} exists and is not a socket')
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            os.unlink(path)
+            return
+        finally:
+            probe.close()
+        raise FileExistsError(f'Another hub is already serving on {path}')
+
+    def start(self):
+        """Start serving subscribers and polling feeds in background threads"""
+        if _HubServer is None:
+            raise OSError('OddsHub requires Unix sockets, which this platform does not support')
+        OddsHub._remove_stale_socket(self.socket_path)
+        self._stop.clear()
+        self._server = _HubServer(self.socket_path, self)
+        self._socket_id = OddsHub._file_id(self.socket_path)
+        self._threads = [
+            threading.Thread(target=self._server.serve_forever, daemon=True),
+            threading.Thread(target=self._poll_forever, daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """Stop polling, disconnect all subscribers and remove the socket"""
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._lock:
+            for outbox in list(self._subscribers):
+                OddsHub._hang_up(outbox)
+            self._subscribers.clear()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        # Leave the path alone if it was since replaced, e.g. by another hub
+        if self._socket_id is not None and \
+                OddsHub._file_id(self.socket_path) == self._socket_id:
+            os.unlink(self.socket_path)
+        self._socket_id = None
+
+    def serve_forever(self):
+        """Start the hub and block until interrupted"""
+        self.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+
+class OddsHubSubscriber(object):
+    """
+    Client side of an OddsHub. Keeps a local copy of the rows of every feed
+    matching its filters, starting from the snapshot sent on connect.
+    """
+
+    def __init__(self, socket_path: str, sports: list = None, markets: list = None,
+                 bookmakers: list = None):
+        """
+        Parameters
+        ----------
+        socket_path : str
+            Path of the Unix socket the hub listens on
+        sports : list[str], optional
+            Sport keys to receive, by default all
+        markets : list[str], optional
+            Market keys to receive, by default all
+        bookmakers : list[str], optional
+            Bookmaker keys to receive, by default all
+        """
+        self.socket_path = socket_path
+        self.filters = {
+            'sports': sports,
+            'markets': markets,
+            'bookmakers': bookmakers
+        }
+        self.feeds = {}
+        self.seq = None
+        self._sock = None
+        self._file = None
+
+    def connect(self):
+        """Connect to the hub and send the filters"""
+        if not hasattr(socket, 'AF_UNIX'):
+            raise OSError('OddsHubSubscriber requires Unix sockets, which this platform does not support')
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(self.socket_path)
+        self._sock.sendall((json.dumps(self.filters) + '\n').encode())
+        self._file = self._sock.makefile('rb')
+        return self
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __iter__(self):
+        """Yield messages from the hub as they arrive, applying each one to
+        feeds before it is yielded. Stops when the hub hangs up.
+        """
+        for line in self._file:
+            message = json.loads(line)
+            if message['type'] == 'snapshot':
+                self.feeds = message['feeds']
+            else:
+                self.feeds[message['feed']] = message['rows']
+            self.seq = message['seq']
+            yield message
+
+    def rows(self):
+        """Get the current rows of all feeds as a single list
+
+        Returns
+        -------
+        list[dict]
+            Normalized rows as produced by theoddsapi.normalize
+        """
+        return [row for rows in self.feeds.values() for row in rows]
@@ -0,0 +1,310 @@
+"""
+Registry of the betting markets listed at
+https://the-odds-api.com/sports-odds-data/betting-markets.html, built once at
+import. Markets are looked up by key in constant time, and the DataFrames
+returned by TheOddsAPI are only built the first time they are asked for.
+"""
+import functools
+import logging
+from collections import namedtuple
+
+logger = logging.getLogger(__name__)
+
+Market = namedtuple('Market', ['key', 'name', 'description', 'category'])
+
+# Market categories. Featured markets are available from every odds
+# endpoint, all other markets one event at a time from the event odds endpoint.
+FEATURED = 'featured'
+ADDITIONAL = 'additional'
+GAME_PERIOD = 'game_period'
+PLAYER_PROP = 'player_prop'
+
+
+def _registry(category: str, markets: list):
+    """Helper function to build a dict of Market keyed by market key"""
+    return {m[0]: Market(m[0], m[1], m[2] if len(m) > 2 else None, category)
+            for m in markets}
+
+
+FEATURED_MARKETS = _registry(FEATURED, [
+    ('h2h', 'Head to head, Moneyline',
+     'Bet on the winning team or player of a game (includes the draw for soccer)'),
+    ('spreads', 'Points spread, Handicap',
+     'The spreads market as featured by a bookmaker. Bet on the winning team after a points handicap has been applied to each team'),
+    ('totals', 'Total points/goals, Over/Under',
+     'The totals market as featured by a bookmaker. Bet on the total score of the game being above or below a threshold'),
+    ('outrights', 'Outrights, Futures',
+     'Bet on a final outcome of a tournament or competition'),
+    ('h2h_lay', 'Head to head, Moneyline',
+     'Bet against a h2h outcome. This market is only applicable to betting exchanges'),
+    ('outrights_lay', 'Outrights, Futures',
+     'Bet against an outrights outcome. This market is only applicable to betting exchanges')
+])
+
+ADDITIONAL_MARKETS = _registry(ADDITIONAL, [
+    ('alternate_spreads', 'Alternate Spreads (handicap)',
+     'All available point spread outcomes for each team'),
+    ('alternate_totals', 'Alternate Totals (Over/Under)',
+     'All available over/under outcomes'),
+    ('btts', 'Both Teams to Score',
+     'Odds that both teams will score during the game. Outcomes are "Yes" or "No". Available for soccer.'),
+    ('draw_no_bet', 'Draw No Bet',
+     'Odds for the match winner, excluding the draw outcome. A draw will result in a returned bet. Available for soccer'),
+    ('h2h_3_way', 'Head to head / Moneyline 3 way',
+     'Match winner including draw'),
+    ('team_totals', 'Team Totals',
+     'Featured team totals (Over/Under)'),
+    ('alternate_team_totals', 'Alternate Team Totals',
+     'All available team totals (Over/Under)')
+])
+
+# Markets for a part of the game, e.g. h2h_q1 or alternate_spreads_h1
+_PERIODS = [
+    ('q1', '1st Quarter'), ('q2', '2nd Quarter'), ('q3', '3rd Quarter'), ('q4', '4th Quarter'),
+    ('h1', '1st Half'), ('h2', '2nd Half'),
+    ('p1', '1st Period'), ('p2', '2nd Period'), ('p3', '3rd Period'),
+    ('1st_1_innings', '1st Inning'), ('1st_3_innings', '1st 3 Innings'),
+    ('1st_5_innings', '1st 5 Innings'), ('1st_7_innings', '1st 7 Innings')
+]
+GAME_PERIOD_MARKETS = _registry(GAME_PERIOD, [
+    (f'{market.key}_{period}',
+     f"{market.name.split(',')[0].split(' (')[0]} ({period_name})",
+     f'{market.name} for the {period_name.lower()}')
+    for market in (FEATURED_MARKETS['h2h'], FEATURED_MARKETS['spreads'],
+                   FEATURED_MARKETS['totals'], ADDITIONAL_MARKETS['alternate_spreads'],
+                   ADDITIONAL_MARKETS['alternate_totals'], ADDITIONAL_MARKETS['h2h_3_way'],
+                   ADDITIONAL_MARKETS['team_totals'],
+                   ADDITIONAL_MARKETS['alternate_team_totals'])
+    for period, period_name in _PERIODS
+])
+
+# Player props by league
+PLAYER_PROPS = {
+    'NFL': _registry(PLAYER_PROP, [
+        ('player_pass_tds', 'Pass Touchdowns (Over/Under)'),
+        ('player_pass_yds', 'Pass Yards (Over/Under)'),
+        ('player_pass_completions', 'Pass Completions (Over/Under)'),
+        ('player_pass_attempts', 'Pass Attempts (Over/Under)'),
+        ('player_pass_interceptions', 'Pass Intercepts (Over/Under)'),
+        ('player_pass_longest_completion', 'Pass Longest Completion (Over/Under)'),
+        ('player_rush_yds', 'Rush Yards (Over/Under)'),
+        ('player_rush_attempts', 'Rush Attempts (Over/Under)'),
+        ('player_rush_longest', 'Longest Rush (Over/Under)'),
+        ('player_receptions', 'Receptions (Over/Under)'),
+        ('player_reception_yds', 'Reception Yards (Over/Under)'),
+        ('player_reception_longest', 'Longest Reception (Over/Under)'),
+        ('player_kicking_points', 'Kicking Points (Over/Under)'),
+        ('player_field_goals', 'Field Goals (Over/Under)'),
+        ('player_tackles_assists', 'Tackles + Assists (Over/Under)'),
+        ('player_1st_td', '1st Touchdown Scorer (Yes/No)'),
+        ('player_last_td', 'Last Touchdown Scorer (Yes/No)'),
+        ('player_anytime_td', 'Anytime Touchdown Scorer (Yes/No)')
+    ]),
+    'NBA': _registry(PLAYER_PROP, [
+        ('player_points', 'Points (Over/Under)'),
+        ('player_rebounds', 'Rebounds (Over/Under)'),
+        ('player_assists', 'Assists (Over/Under)'),
+        ('player_threes', 'Threes (Over/Under)'),
+        ('player_blocks', 'Blocks (Over/Under)'),
+        ('player_steals', 'Steals (Over/Under)'),
+        ('player_blocks_steals', 'Blocks + Steals (Over/Under)'),
+        ('player_turnovers', 'Turnovers (Over/Under)'),
+        ('player_points_rebounds_assists', 'Points + Rebounds + Assists (Over/Under)'),
+        ('player_points_rebounds', 'Points + Rebounds (Over/Under)'),
+        ('player_points_assists', 'Points + Assists (Over/Under)'),
+        ('player_rebounds_assists', 'Rebounds + Assists (Over/Under)'),
+        ('player_first_basket', 'First Basket Scorer (Yes/No)'),
+        ('player_double_double', 'Double Double (Yes/No)'),
+        ('player_triple_double', 'Triple Double (Yes/No)')
+    ]),
+    'NHL': _registry(PLAYER_PROP, [
+        ('player_points', 'Points (Over/Under)'),
+        ('player_power_play_points', 'Power Play Points (Over/Under)'),
+        ('player_assists', 'Assists (Over/Under)'),
+        ('player_blocked_shots', 'Blocked Shots (Over/Under)'),
+        ('player_shots_on_goal', 'Shots on Goal (Over/Under)'),
+        ('player_goals', 'Goals (Over/Under)'),
+        ('player_total_saves', 'Total Saves (Over/Under)'),
+        ('player_goal_scorer_first', 'First Goal Scorer (Yes/No)'),
+        ('player_goal_scorer_last', 'Last Goal Scorer (Yes/No)'),
+        ('player_goal_scorer_anytime', 'Anytime Goal Scorer (Yes/No)')
+    ]),
+    'MLB': _registry(PLAYER_PROP, [
+        ('batter_home_runs', 'Batter Home Runs (Over/Under)'),
+        ('batter_first_home_run', 'Batter First Home Run (Yes/No)'),
+        ('batter_hits', 'Batter Hits (Over/Under)'),
+        ('batter_total_bases', 'Batter Total Bases (Over/Under)'),
+        ('batter_rbis', 'Batter RBIs (Over/Under)'),
+        ('batter_runs_scored', 'Batter Runs Scored (Over/Under)'),
+        ('batter_hits_runs_rbis', 'Batter Hits + Runs + RBIs (Over/Under)'),
+        ('batter_singles', 'Batter Singles (Over/Under)'),
+        ('batter_doubles', 'Batter Doubles (Over/Under)'),
+        ('batter_triples', 'Batter Triples (Over/Under)'),
+        ('batter_walks', 'Batter Walks (Over/Under)'),
+        ('batter_strikeouts', 'Batter Strikeouts (Over/Under)'),
+        ('batter_stolen_bases', 'Batter Stolen Bases (Over/Under)'),
+        ('pitcher_strikeouts', 'Pitcher Strikeouts (Over/Under)'),
+        ('pitcher_record_a_win', 'Pitcher to Record a Win (Yes/No)'),
+        ('pitcher_hits_allowed', 'Pitcher Hits Allowed (Over/Under)'),
+        ('pitcher_walks', 'Pitcher Walks (Over/Under)'),
+        ('pitcher_earned_runs', 'Pitcher Earned Runs (Over/Under)'),
+        ('pitcher_outs', 'Pitcher Outs (Over/Under)')
+    ])
+}
+
+# League whose player props are offered for each sport key
+SPORT_LEAGUES = {
+    'americanfootball_nfl': 'NFL',
+    'americanfootball_ncaaf': 'NFL',
+    'basketball_nba': 'NBA',
+    'basketball_ncaab': 'NBA',
+    'basketball_wnba': 'NBA',
+    'icehockey_nhl': 'NHL',
+    'baseball_mlb': 'MLB'
+}
+
+# Every known market by key. Props shared by several leagues (e.g.
+# player_points) appear once.
+MARKETS = {}
+for _markets in [FEATURED_MARKETS, ADDITIONAL_MARKETS, GAME_PERIOD_MARKETS] + \
+        list(PLAYER_PROPS.values()):
+    for _key, _market in _markets.items():
+        MARKETS.setdefault(_key, _market)
+del _markets, _key, _market
+
+
+def get_market(key: str):
+    """Get a market by key
+
+    Parameters
+    ----------
+    key : str
+        Market key, e.g. 'h2h' or 'player_points'
+
+    Returns
+    -------
+    Market
+        Named tuple of key, name, description and category
+    """
+    try:
+        return MARKETS[key]
+    except KeyError:
+        raise KeyError(f'Unknown market: {key}')
+
+
+def _league(sport: str):
+    """Helper function to get the league of a league name or sport key"""
+    league = SPORT_LEAGUES.get(sport, sport.upper()) if isinstance(sport, str) else None
+    if league not in PLAYER_PROPS:
+        raise ValueError(
+            f'No player props for sport: {sport}. Valid sports are: '
+            f'{list(PLAYER_PROPS) + list(SPORT_LEAGUES)}')
+    return league
+
+
+def get_player_props(sport: str):
+    """Get the player props offered for a sport
+
+    Parameters
+    ----------
+    sport : str
+        League ('NFL', 'NBA', 'NHL', 'MLB') or sport key (e.g. 'basketball_nba')
+
+    Returns
+    -------
+    dict
+        Market keyed by market key
+    """
+    return PLAYER_PROPS[_league(sport)]
+
+
+def validate_markets(markets, event: bool = False, sport: str = None):
+    """Check the markets of a request before it is sent
+
+    Parameters
+    ----------
+    markets : str or list[str]
+        Comma delimited market keys or a list of market keys
+    event : bool, optional
+        Whether the request is for a single event, which accepts every
+        market. Otherwise only featured markets are accepted. By default False.
+    sport : str, optional
+        Sport key of the request, used to check player props are offered
+        for the sport
+
+    Without event the valid markets are exactly the featured markets, so
+    any other key is an error. Event requests accept more markets than are
+    listed here, such as alternate player props, so keys missing from the
+    registry are sent as they are with a warning logged.
+
+    Raises
+    ------
+    ValueError
+        If a market is not available from the endpoint or a known player
+        prop is not offered for the sport
+    """
+    keys = markets.split(',') if isinstance(markets, str) else markets
+    for key in keys:
+        key = key.strip()
+        market = MARKETS.get(key)
+        if market is None and not event:
+            raise ValueError(
+                f'Invalid market: {key}. Valid markets are: {list(FEATURED_MARKETS)}')
+        if market is None:
+            logger.warning(
+                'Unknown market: %s. See get_featured_betting_markets, '
+                'get_additional_markets and get_player_props for known markets', key)
+            continue
+        if not event and market.category != FEATURED:
+            raise ValueError(
+                f'Market {key} is only available one event at a time, use get_event_odds')
+        if market.category == PLAYER_PROP and sport in SPORT_LEAGUES and \
+                key not in PLAYER_PROPS[SPORT_LEAGUES[sport]]:
+            raise ValueError(f'Player prop {key} is not offered for {sport}')
+
+
+@functools.lru_cache(maxsize=None)
+def _frame(name: str, league: str = None):
+    """Helper function building each DataFrame view once, on first use"""
+    import pandas as pd
+    if name == 'featured':
+        # Column names kept as returned by earlier versions
+        return pd.DataFrame({
+            'market_key': [m.key for m in FEATURED_MARKETS.values()],
+            'market_names': [m.name for m in FEATURED_MARKETS.values()],
+            'description': [m.description for m in FEATURED_MARKETS.values()]
+        })
+    if name == 'additional':
+        return pd.DataFrame({
+            'market_key': [m.key for m in ADDITIONAL_MARKETS.values()],
+            'market_name': [m.name for m in ADDITIONAL_MARKETS.values()],
+            'description': [m.description for m in ADDITIONAL_MARKETS.values()]
+        })
+    props = PLAYER_PROPS[league]
+    return pd.DataFrame({
+        'market_key': [m.key for m in props.values()],
+        'market_name': [m.name for m in props.values()]
+    })
+
+
+def markets_frame(name: str, sport: str = None):
+    """Get a DataFrame view of the registry
+
+    Parameters
+    ----------
+    name : str
+        'featured', 'additional' or 'player_props'
+    sport : str, optional
+        League or sport key, required for 'player_props'
+
+    Returns
+    -------
+    pd.DataFrame
+        A copy of the cached view, safe to modify
+    """
+    if name == 'player_props':
+        return _frame(name, _league(sport)).copy()
+    if name not in ('featured', 'additional'):
+        raise ValueError(
+            f"Invalid view: {name}. Valid views are: ['featured', 'additional', 'player_props']")
+    return _frame(name).copy()
@@ -0,0 +1,194 @@
+"""
+Helpers to flatten the nested JSON returned by The Odds API into flat rows
+with a fixed set of columns, so that results from different endpoints and
+snapshots can be compared, filtered and written out as tables.
+"""
+
+# Columns of a normalized odds row. One row is produced per outcome.
+ODDS_COLUMNS = [
+    'snapshot_timestamp',
+    'event_id',
+    'sport_key',
+    'commence_time',
+    'home_team',
+    'away_team',
+    'bookmaker',
+    'bookmaker_last_update',
+    'market',
+    'market_last_update',
+    'outcome',
+    'description',
+    'price',
+    'point'
+]
+
+# Columns of a normalized scores row. One row is produced per event.
+SCORES_COLUMNS = [
+    'event_id',
+    'sport_key',
+    'commence_time',
+    'completed',
+    'home_team',
+    'away_team',
+    'home_score',
+    'away_score',
+    'last_update'
+]
+
+# Types of the columns that do not hold strings, used to build typed tables
+COLUMN_TYPES = {
+    'price': float,
+    'point': float,
+    'completed': bool
+}
+
+
+def _unwrap(response, timestamp=None):
+    """Helper function to get the list of events out of any odds response
+
+    Parameters
+    ----------
+    response : list or dict
+        Response of get_odds (list of events), get_event_odds (single event)
+        or get_historical_odds (dict with the events under 'data').
+    timestamp : str, optional
+        Snapshot timestamp to use when the response does not carry one.
+
+    Returns
+    -------
+    tuple
+        (events, timestamp)
+    """
+    if isinstance(response, dict):
+        if 'data' in response:
+            timestamp = response.get('timestamp', timestamp)
+            response = response['data']
+        else:
+            response = [response]
+    if isinstance(response, dict):
+        # Historical event odds wrap a single event under 'data'
+        response = [response]
+    return response, timestamp
+
+
+def normalize_odds(response, timestamp=None):
+    """Flatten an odds response into one row per outcome
+
+    Parameters
+    ----------
+    response : list or dict
+        Response of get_odds, get_event_odds or get_historical_odds.
+    timestamp : str, optional
+        Snapshot timestamp to record on each row. Taken from the response
+        itself for historical responses.
+
+    Returns
+    -------
+    list[dict]
+        Rows keyed by the names in ODDS_COLUMNS
+    """
+    events, timestamp = _unwrap(response, timestamp)
+    rows = []
+    for event in events:
+        for bookmaker in event.get('bookmakers') or []:
+            for market in bookmaker.get('markets') or []:
+                for outcome in market.get('outcomes') or []:
+                    rows.append({
+                        'snapshot_timestamp': timestamp,
+                        'event_id': event.get('id'),
+                        'sport_key': event.get('sport_key'),
+                        'commence_time': event.get('commence_time'),
+                        'home_team': event.get('home_team'),
+                        'away_team': event.get('away_team'),
+                        'bookmaker': bookmaker.get('key'),
+                        'bookmaker_last_update': bookmaker.get('last_update'),
+                        'market': market.get('key'),
+                        'market_last_update': market.get('last_update'),
+                        'outcome': outcome.get('name'),
+                        'description': outcome.get('description'),
+                        'price': outcome.get('price'),
+                        'point': outcome.get('point')
+                    })
+    return rows
+
+
+def normalize_scores(response):
+    """Flatten a scores response into one row per event
+
+    Parameters
+    ----------
+    response : list
+        Response of get_scores.
+
+    Returns
+    -------
+    list[dict]
+        Rows keyed by the names in SCORES_COLUMNS
+    """
+    rows = []
+    for event in response:
+        # Scores is null for games that have not started yet
+        scores = {s.get('name'): s.get('score')
+                  for s in event.get('scores') or []}
+        rows.append({
+            'event_id': event.get('id'),
+            'sport_key': event.get('sport_key'),
+            'commence_time': event.get('commence_time'),
+            'completed': event.get('completed'),
+            'home_team': event.get('home_team'),
+            'away_team': event.get('away_team'),
+            'home_score': scores.get(event.get('home_team')),
+            'away_score': scores.get(event.get('away_team')),
+            'last_update': event.get('last_update')
+        })
+    return rows
+
+
+def filter_rows(rows, sports=None, markets=None, bookmakers=None):
+    """Keep only the rows matching the given sports, markets and bookmakers
+
+    A filter left as None matches everything. Rows without the filtered
+    column (e.g. scores rows have no market) are kept.
+
+    Parameters
+    ----------
+    rows : list[dict]
+        Normalized rows
+    sports : iterable of str, optional
+        Sport keys to keep
+    markets : iterable of str, optional
+        Market keys to keep
+    bookmakers : iterable of str, optional
+        Bookmaker keys to keep
+
+    Returns
+    -------
+    list[dict]
+        The matching rows
+    """
+    filters = [(column, set(values)) for column, values in
+               (('sport_key', sports), ('market', markets), ('bookmaker', bookmakers))
+               if values]
+    if not filters:
+        return list(rows)
+    return [row for row in rows
+            if all(column not in row or row[column] in values
+                   for column, values in filters)]
+
+
+def rows_to_columns(rows, columns):
+    """Turn a list of rows into a dict of column lists
+
+    Parameters
+    ----------
+    rows : list[dict]
+        Normalized rows
+    columns : list[str]
+        Column names, e.g. ODDS_COLUMNS or SCORES_COLUMNS
+
+    Returns
+    -------
+    dict
+        One list of values per column, in the order of columns
+    """
+    return {column: [row.get(column) for row in rows] for column in columns}
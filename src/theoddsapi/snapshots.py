@@ -0,0 +1,278 @@
+import bisect
+import hashlib
+import json
+import os
+
+
+class SnapshotStore(object):
+    """
+    Stores consecutive get_historical_odds responses on disk without
+    repeating the parts that did not change between snapshots.
+
+    Each response is split into blocks: one per event (teams, commence time),
+    one per (event, bookmaker) and one per (event, bookmaker, market). A
+    snapshot is written as the blocks whose hash changed since the previous
+    snapshot plus the keys of the blocks that disappeared. Every
+    keyframe_interval snapshots all blocks are written again, so reading a
+    snapshot only replays the frames since the closest keyframe.
+
+    The store lives in a directory holding frames.ndjson, the frames
+    themselves, and index.ndjson, one line per frame with its timestamp and
+    byte offset. Snapshots must be appended in increasing timestamp order by
+    a single writer. Timestamps are compared as strings, so they must all use
+    the same ISO 8601 format, as returned by the API.
+    """
+
+    # One day of snapshots at 5 minute intervals
+    KEYFRAME_INTERVAL = 288
+
+    FRAMES_FILE = 'frames.ndjson'
+    INDEX_FILE = 'index.ndjson'
+
+    def __init__(self, path: str, keyframe_interval: int = KEYFRAME_INTERVAL):
+        """
+        Parameters
+        ----------
+        path : str
+            Directory of the store. Created if it does not exist.
+        keyframe_interval : int, optional
+            Number of snapshots between two full copies, by default 288
+        """
+        if keyframe_interval < 1:
+            raise ValueError(
+                f'Invalid keyframe_interval: {keyframe_interval}. Must be at least 1')
+        self.path = path
+        self.keyframe_interval = keyframe_interval
+        os.makedirs(path, exist_ok=True)
+        self._frames_path = os.path.join(path, SnapshotStore.FRAMES_FILE)
+        self._index_path = os.path.join(path, SnapshotStore.INDEX_FILE)
+        self._index = []
+        if os.path.exists(self._index_path):
+            with open(self._index_path) as f:
+                self._index = [json.loads(line) for line in f if line.strip()]
+        self._timestamps = [entry['timestamp'] for entry in self._index]
+        # Drop a frame written without its index line, e.g. after a crash
+        end = self._index[-1]['offset'] + self._index[-1]['length'] if self._index else 0
+        if os.path.exists(self._frames_path) and os.path.getsize(self._frames_path) > end:
+            with open(self._frames_path, 'r+b') as f:
+                f.truncate(end)
+        # Hashes of the blocks of the last snapshot, loaded on first append
+        self._hashes = None
+
+    @staticmethod
+    def _split(response: dict):
+        """Helper function to split a historical odds response into blocks
+
+        Returns
+        -------
+        dict
+            Blocks keyed by 'event', 'event/bookmaker' or
+            'event/bookmaker/market', in response order
+        """
+        blocks = {}
+        for event in response.get('data') or []:
+            event_id = event['id']
+            blocks[event_id] = {k: v for k, v in event.items() if k != 'bookmakers'}
+            for bookmaker in event.get('bookmakers') or []:
+                bookmaker_key = f"{event_id}/{bookmaker['key']}"
+                blocks[bookmaker_key] = {k: v for k, v in bookmaker.items()
+                                         if k != 'markets'}
+                for market in bookmaker.get('markets') or []:
+                    blocks[f"{bookmaker_key}/{market['key']}"] = market
+        return blocks
+
+    @staticmethod
+    def _join(header: dict, blocks: dict):
+        """Helper function to rebuild a historical odds response from blocks"""
+        events = {}
+        for key, block in blocks.items():
+            parts = key.split('/')
+            if len(parts) == 1:
+                events[key] = dict(block, bookmakers=[])
+            elif len(parts) == 2:
+                events[parts[0]]['bookmakers'].append(dict(block, markets=[]))
+            else:
+                events[parts[0]]['bookmakers'][-1]['markets'].append(block)
+        return dict(header, data=list(events.values()))
+
+    @staticmethod
+    def _order(blocks: dict):
+        """Helper function to put blocks in the order _join expects
+
+        Blocks added by a delta are appended at the end, so group every
+        bookmaker and market back under its event and bookmaker.
+        """
+        children = {}
+        for key in blocks:
+            parent = key.rsplit('/', 1)[0] if '/' in key else None
+            children.setdefault(parent, []).append(key)
+        ordered = {}
+        stack = list(reversed(children.get(None, [])))
+        while stack:
+            key = stack.pop()
+            ordered[key] = blocks[key]
+            stack.extend(reversed(children.get(key, [])))
+        return ordered
+
+    @staticmethod
+    def _hash(block):
+        encoded = json.dumps(block, sort_keys=True, separators=(',', ':'))
+        return hashlib.blake2b(encoded.encode(), digest_size=16).digest()
+
+    def _read_frames(self, start: int, stop: int):
+        """Helper function to read the frames of index positions start..stop"""
+        first, last = self._index[start], self._index[stop]
+        with open(self._frames_path, 'rb') as f:
+            f.seek(first['offset'])
+            chunk = f.read(last['offset'] + last['length'] - first['offset'])
+        return [json.loads(line) for line in chunk.splitlines()]
+
+    def _load_blocks(self, position: int):
+        """Helper function to replay frames up to an index position
+
+        Returns
+        -------
+        tuple
+            (header, blocks) of the snapshot at that position
+        """
+        keyframe = position
+        while not self._index[keyframe]['keyframe']:
+            keyframe -= 1
+        blocks = {}
+        for frame in self._read_frames(keyframe, position):
+            for key in frame['removed']:
+                del blocks[key]
+            blocks.update(frame['set'])
+        return frame['header'], blocks
+
+    def append(self, response: dict):
+        """Add a get_historical_odds response to the store
+
+        Parameters
+        ----------
+        response : dict
+            Response of get_historical_odds, with the snapshot 'timestamp'
+            and the events under 'data'
+
+        Returns
+        -------
+        int
+            Number of blocks written for this snapshot
+        """
+        timestamp = response['timestamp']
+        if self._timestamps and timestamp <= self._timestamps[-1]:
+            raise ValueError(
+                f'Snapshot {timestamp} is not newer than the last stored snapshot {self._timestamps[-1]}')
+        if self._hashes is None:
+            self._hashes = {}
+            if self._index:
+                _, blocks = self._load_blocks(len(self._index) - 1)
+                self._hashes = {key: SnapshotStore._hash(block)
+                                for key, block in blocks.items()}
+
+        blocks = SnapshotStore._split(response)
+        hashes = {key: SnapshotStore._hash(block) for key, block in blocks.items()}
+        keyframe = len(self._index) % self.keyframe_interval == 0
+        if keyframe:
+            changed = blocks
+            removed = []
+        else:
+            changed = {key: block for key, block in blocks.items()
+                       if self._hashes.get(key) != hashes[key]}
+            removed = [key for key in self._hashes if key not in hashes]
+        frame = {
+            'header': {k: v for k, v in response.items() if k != 'data'},
+            'set': changed,
+            'removed': removed
+        }
+        line = (json.dumps(frame, separators=(',', ':')) + '\n').encode()
+        offset = os.path.getsize(self._frames_path) if os.path.exists(self._frames_path) else 0
+        with open(self._frames_path, 'ab') as f:
+            f.write(line)
+        entry = {
+            'timestamp': timestamp,
+            'offset': offset,
+            'length': len(line),
+            'keyframe': keyframe,
+            'raw_bytes': len(json.dumps(response, separators=(',', ':')))
+        }
+        # The index line is written last so a partial append is discarded on
+        # the next open
+        with open(self._index_path, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+        self._index.append(entry)
+        self._timestamps.append(timestamp)
+        self._hashes = hashes
+        return len(changed)
+
+    def timestamps(self):
+        """Get the timestamps of all stored snapshots, oldest first
+
+        Returns
+        -------
+        list[str]
+        """
+        return list(self._timestamps)
+
+    def get(self, timestamp: str):
+        """Rebuild the snapshot at a given time
+
+        Like the historical odds endpoint, the closest snapshot equal to or
+        earlier than timestamp is returned.
+
+        Parameters
+        ----------
+        timestamp : str
+            ISO 8601 timestamp in the same format as the stored snapshots
+
+        Returns
+        -------
+        dict
+            The response originally passed to append. Events, bookmakers and
+            markets are ordered by when they first appeared since the last
+            keyframe.
+        """
+        position = bisect.bisect_right(self._timestamps, timestamp) - 1
+        if position < 0:
+            raise KeyError(f'No snapshot at or before {timestamp}')
+        header, blocks = self._load_blocks(position)
+        return SnapshotStore._join(header, SnapshotStore._order(blocks))
+
+    def __len__(self):
+        return len(self._index)
+
+    def __iter__(self):
+        """Yield every stored snapshot, oldest first, in a single pass"""
+        if not self._index:
+            return
+        blocks = {}
+        with open(self._frames_path, 'rb') as f:
+            for entry, line in zip(self._index, f):
+                frame = json.loads(line)
+                # A keyframe lists every current block, drop all the others
+                if entry['keyframe']:
+                    blocks = {}
+                for key in frame['removed']:
+                    del blocks[key]
+                blocks.update(frame['set'])
+                yield SnapshotStore._join(frame['header'], SnapshotStore._order(blocks))
+
+    def stats(self):
+        """Get the size of the store compared to storing each snapshot in full
+
+        Returns
+        -------
+        dict
+            Number of snapshots and keyframes, raw_bytes (compact JSON size of
+            all appended responses), stored_bytes (size of the frames file)
+            and compression_ratio (raw_bytes / stored_bytes)
+        """
+        raw_bytes = sum(entry['raw_bytes'] for entry in self._index)
+        stored_bytes = os.path.getsize(self._frames_path) if os.path.exists(self._frames_path) else 0
+        return {
+            'snapshots': len(self._index),
+            'keyframes': sum(1 for entry in self._index if entry['keyframe']),
+            'raw_bytes': raw_bytes,
+            'stored_bytes': stored_bytes,
+            'compression_ratio': raw_bytes / stored_bytes if stored_bytes else None
+        }
@@ -0,0 +1,120 @@
+import csv
+import json
+import os
+
+from .normalize import COLUMN_TYPES, rows_to_columns
+
+# File extension of each supported output format
+FORMATS = {
+    'csv': 'csv',
+    'ndjson': 'ndjson',
+    'parquet': 'parquet'
+}
+
+
+class TableWriter(object):
+    """
+    Writes normalized rows to a CSV, NDJSON or Parquet file in batches, so
+    that only the batch being written is held in memory.
+
+    Rows go to a temporary file next to path which is renamed to path on
+    close, so a file at path is always complete. Parquet output requires
+    pyarrow (pip install theoddsapi[parquet]).
+    """
+
+    def __init__(self, path: str, format: str, columns: list):
+        """
+        Parameters
+        ----------
+        path : str
+            Path of the file to write
+        format : str
+            One of 'csv', 'ndjson' or 'parquet'
+        columns : list[str]
+            Columns to write, e.g. ODDS_COLUMNS or SCORES_COLUMNS
+        """
+        if format not in FORMATS:
+            raise ValueError(
+                f'Invalid format: {format}. Valid formats are: {list(FORMATS)}')
+        self.path = path
+        self.format = format
+        self.columns = columns
+        self.rows_written = 0
+        self._tmp_path = path + '.part'
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = None
+        self._writer = None
+        if format == 'parquet':
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError(
+                    'Parquet output requires pyarrow. Install it with: pip install theoddsapi[parquet]')
+            types = {str: pa.string(), float: pa.float64(), bool: pa.bool_()}
+            self._schema = pa.schema(
+                [(column, types[COLUMN_TYPES.get(column, str)]) for column in columns])
+            self._writer = pq.ParquetWriter(self._tmp_path, self._schema)
+        else:
+            self._file = open(self._tmp_path, 'w', newline='')
+            if format == 'csv':
+                self._writer = csv.writer(self._file)
+                self._writer.writerow(columns)
+
+    def write(self, rows: list):
+        """Append a batch of rows to the file
+
+        Parameters
+        ----------
+        rows : list[dict]
+            Normalized rows
+        """
+        self.write_columns(rows_to_columns(rows, self.columns))
+
+    def write_columns(self, columns: dict):
+        """Append a batch of rows given as one list of values per column
+
+        Parameters
+        ----------
+        columns : dict
+            Lists of values of the same length keyed by column name, as
+            returned by rows_to_columns. Missing columns are written empty.
+        """
+        length = max((len(values) for values in columns.values()), default=0)
+        values = [columns.get(column) or [None] * length for column in self.columns]
+        if self.format == 'csv':
+            self._writer.writerows(zip(*values))
+        elif self.format == 'ndjson':
+            for row in zip(*values):
+                self._file.write(json.dumps(dict(zip(self.columns, row))) + '\n')
+        elif length:
+            import pyarrow as pa
+            self._writer.write_table(pa.Table.from_pydict(
+                dict(zip(self.columns, values)), schema=self._schema))
+        self.rows_written += length
+
+    def close(self):
+        """Finish the file and move it to its final path"""
+        if self._file is not None:
+            self._file.close()
+        elif self._writer is not None:
+            self._writer.close()
+        os.replace(self._tmp_path, self.path)
+
+    def abort(self):
+        """Discard the file without writing it to its final path"""
+        if self._file is not None:
+            self._file.close()
+        elif self._writer is not None:
+            self._writer.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
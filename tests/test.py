@@ -1,7 +1,12 @@
 import unittest
 from read_env_keys import read_key_from_env
-from theoddsapi import TheOddsAPI
+from theoddsapi import TheOddsAPI, OddsHub, OddsHubSubscriber, SnapshotStore
+from theoddsapi import cli, normalize_archive, markets
+import csv
+import json
+import os
 import sys
+import tempfile
 
 
 class TestTheOddsAPI(unittest.TestCase):
@@ -241,6 +246,253 @@ class TestGetUsageQuotas(TestTheOddsAPI):
         print(f'{requests_used} requests used...')
 
 
+class _FakeClient(object):
+    """Stands in for TheOddsAPI in tests that must not use the quota"""
+    requests_remaining = None
+    requests_used = None
+
+    def get_odds(self, **kwargs):
+        return [{
+            'id': 'e1',
+            'sport_key': kwargs['sport'],
+            'commence_time': '2023-02-15T00:00:00Z',
+            'home_team': 'Home',
+            'away_team': 'Away',
+            'bookmakers': [
+                {'key': key, 'title': key, 'markets': [
+                    {'key': 'h2h', 'outcomes': [
+                        {'name': 'Home', 'price': 1.9},
+                        {'name': 'Away', 'price': 1.9}]}]}
+                for key in ('fanduel', 'draftkings')]
+        }]
+
+    def get_scores(self, **kwargs):
+        return []
+
+
+class TestOddsHub(unittest.TestCase):
+
+    def test_snapshot_on_connect(self):
+        socket_path = os.path.join(tempfile.mkdtemp(), 'hub.sock')
+        hub = OddsHub(_FakeClient(),
+                      [{'kind': 'odds', 'sport': 'basketball_nba'}],
+                      socket_path, interval=3600)
+        hub.poll()
+        hub.start()
+        try:
+            with OddsHubSubscriber(socket_path, bookmakers=['fanduel']) as sub:
+                message = next(iter(sub))
+        finally:
+            hub.stop()
+        assert message['type'] == 'snapshot'
+        rows = sub.rows()
+        assert len(rows) == 2
+        assert all(row['bookmaker'] == 'fanduel' for row in rows)
+        print('Successfully got hub snapshot...')
+
+    def test_feeds_for_same_sport(self):
+        feeds = [{'kind': 'odds', 'sport': 'basketball_nba', 'markets': 'h2h'},
+                 {'kind': 'odds', 'sport': 'basketball_nba', 'markets': 'spreads'}]
+        hub = OddsHub(_FakeClient(), feeds, 'unused.sock')
+        hub.poll()
+        hub.poll()
+        # Each feed is kept and published once, the second poll changes nothing
+        assert len(hub._rows) == 2
+        assert hub._seq == 2
+        with self.assertRaises(ValueError):
+            OddsHub(_FakeClient(), feeds + feeds[:1], 'unused.sock')
+        print('Successfully kept feeds for the same sport apart...')
+
+    def test_socket_path_in_use(self):
+        directory = tempfile.mkdtemp()
+        not_a_socket = os.path.join(directory, 'file')
+        with open(not_a_socket, 'w') as f:
+            f.write('keep me')
+        with self.assertRaises(FileExistsError):
+            OddsHub(_FakeClient(), [], not_a_socket, interval=3600).start()
+        assert os.path.exists(not_a_socket)
+
+        socket_path = os.path.join(directory, 'hub.sock')
+        hub = OddsHub(_FakeClient(), [], socket_path, interval=3600)
+        hub.start()
+        try:
+            with self.assertRaises(FileExistsError):
+                OddsHub(_FakeClient(), [], socket_path, interval=3600).start()
+        finally:
+            hub.stop()
+
+    def test_stop_keeps_replaced_socket(self):
+        socket_path = os.path.join(tempfile.mkdtemp(), 'hub.sock')
+        first = OddsHub(_FakeClient(), [], socket_path, interval=3600)
+        first.start()
+        # Another hub takes over the path while the first is still running
+        os.unlink(socket_path)
+        second = OddsHub(_FakeClient(), [], socket_path, interval=3600)
+        second.start()
+        try:
+            first.stop()
+            assert os.path.exists(socket_path)
+        finally:
+            second.stop()
+        assert not os.path.exists(socket_path)
+
+    def test_publish_failure(self):
+        hub = OddsHub(_FakeClient(),
+                      [{'kind': 'odds', 'sport': 'basketball_nba'}],
+                      os.path.join(tempfile.mkdtemp(), 'hub.sock'))
+
+        def publish(name, rows):
+            raise RuntimeError('publish failed')
+        hub._publish = publish
+        with self.assertLogs('theoddsapi.hub', 'ERROR'):
+            hub.poll()
+        print('Successfully survived a publish failure...')
+
+    def test_validate_markets_opt_out(self):
+        feeds = [{'kind': 'odds', 'sport': 'basketball_nba', 'markets': 'btts'}]
+        with self.assertRaises(ValueError):
+            OddsHub(TheOddsAPI('not-a-key'), feeds, 'unused.sock')
+        OddsHub(TheOddsAPI('not-a-key', validate_markets=False), feeds, 'unused.sock')
+
+
+class TestSnapshotStore(unittest.TestCase):
+
+    def _snapshot(self, timestamp, price, bookmakers=('fanduel', 'draftkings')):
+        response = {'timestamp': timestamp, 'data': _FakeClient().get_odds(sport='basketball_nba')}
+        event = response['data'][0]
+        event['bookmakers'] = [b for b in event['bookmakers'] if b['key'] in bookmakers]
+        event['bookmakers'][0]['markets'][0]['outcomes'][0]['price'] = price
+        return response
+
+    def test_reconstruct_snapshots(self):
+        store = SnapshotStore(tempfile.mkdtemp(), keyframe_interval=3)
+        snapshots = [
+            self._snapshot('2023-02-15T12:00:00Z', 1.9),
+            self._snapshot('2023-02-15T12:05:00Z', 1.9),
+            self._snapshot('2023-02-15T12:10:00Z', 2.0, bookmakers=('fanduel',)),
+            self._snapshot('2023-02-15T12:15:00Z', 2.1),
+            self._snapshot('2023-02-15T12:20:00Z', 2.1),
+            self._snapshot('2023-02-15T12:25:00Z', 2.1),
+            # Keyframe dropping a bookmaker
+            self._snapshot('2023-02-15T12:30:00Z', 2.1, bookmakers=('fanduel',)),
+            self._snapshot('2023-02-15T12:35:00Z', 2.2, bookmakers=('fanduel',))
+        ]
+        written = [store.append(snapshot) for snapshot in snapshots]
+        # An unchanged snapshot only stores its header
+        assert written[1] == 0
+        # Reopen to read from disk only
+        store = SnapshotStore(store.path, keyframe_interval=3)
+        for snapshot in snapshots:
+            assert store.get(snapshot['timestamp']) == snapshot
+        assert store.get('2023-02-15T12:07:00Z') == snapshots[1]
+        assert list(store) == snapshots
+        assert store.stats()['compression_ratio'] > 1
+        print('Successfully reconstructed snapshots...')
+
+
+class TestExportCLI(TestTheOddsAPI):
+
+    def test_export_and_resume(self):
+        output = tempfile.mkdtemp()
+        argv = ['history', '--sports', 'basketball_nba', '--markets', 'h2h',
+                '--bookmakers', 'fanduel', '--start', '2023-01-01T12:00:00Z',
+                '--end', '2023-01-01T12:05:00Z', '--format', 'ndjson',
+                '--output', output, '--api-key', self.api_key]
+        assert cli.main(argv) == 0
+        exported = os.listdir(os.path.join(output, 'history', 'basketball_nba'))
+        assert sorted(exported) == ['20230101T120000Z.ndjson', '20230101T120500Z.ndjson']
+        # Nothing is left to request when resuming a completed export
+        args = cli._build_parser().parse_args(argv + ['--resume'])
+        assert cli.export(_FakeClient(), args) == 0
+        print('Successfully exported historical odds...')
+
+    def test_resume_with_other_settings(self):
+        output = tempfile.mkdtemp()
+        argv = ['scores', '--sports', 'basketball_nba', '--output', output,
+                '--api-key', 'unused']
+        args = cli._build_parser().parse_args(argv)
+        assert cli.export(_FakeClient(), args) == 0
+        # Resuming into the same directory with another format must not
+        # skip the exports made in the old format
+        args = cli._build_parser().parse_args(argv + ['--resume', '--format', 'ndjson'])
+        with self.assertRaises(ValueError):
+            cli.export(_FakeClient(), args)
+        args = cli._build_parser().parse_args(argv + ['--resume'])
+        assert cli.export(_FakeClient(), args) == 0
+
+
+class TestNormalizeArchive(unittest.TestCase):
+
+    def test_normalize_archive(self):
+        source = tempfile.mkdtemp()
+        for i, timestamp in enumerate(['2023-02-15T12:00:00Z', '2023-02-15T12:05:00Z',
+                                       '2023-02-16T12:00:00Z']):
+            response = {'timestamp': timestamp,
+                        'data': _FakeClient().get_odds(sport='basketball_nba')}
+            with open(os.path.join(source, f'{i}.json'), 'w') as f:
+                json.dump(response, f)
+        with open(os.path.join(source, 'truncated.json'), 'w') as f:
+            f.write('{bad')
+        # A small chunk_rows forces partitions to be written in several parts
+        for chunk_rows in [100000, 3]:
+            output = os.path.join(tempfile.mkdtemp(), 'dataset')
+            stats = normalize_archive(source, output, format='csv', workers=2,
+                                      chunk_rows=chunk_rows)
+            assert stats['files'] == 3
+            assert stats['rows'] == 12
+            assert stats['partitions'] == 2
+            assert [path for path, _ in stats['failed_files']] == \
+                [os.path.join(source, 'truncated.json')]
+            path = os.path.join(output, 'sport_key=basketball_nba', 'date=2023-02-15', 'data.csv')
+            with open(path) as f:
+                assert len(list(csv.DictReader(f))) == 8
+        print('Successfully normalized archive...')
+
+
+class TestMarketRegistry(unittest.TestCase):
+
+    def test_get_player_props(self):
+        for sport in ['NFL', 'NBA', 'NHL', 'MLB', 'basketball_nba']:
+            props = TheOddsAPI.get_player_props(sport)
+            assert len(props) > 0
+            assert props['market_key'].is_unique
+        assert 'player_points' in list(TheOddsAPI.get_player_props('NBA')['market_key'])
+        assert 'player_rebounds' in list(TheOddsAPI.get_player_props('NBA')['market_key'])
+        with self.assertRaises(ValueError):
+            TheOddsAPI.get_player_props('curling')
+        with self.assertRaises(ValueError):
+            markets.get_player_props(None)
+        print('Successfully got player props...')
+
+    def test_views_are_copies(self):
+        featured = TheOddsAPI.get_featured_betting_markets()
+        featured.drop(featured.index, inplace=True)
+        assert len(TheOddsAPI.get_featured_betting_markets()) == len(markets.FEATURED_MARKETS)
+
+    def test_validate_markets(self):
+        # Invalid requests are rejected before anything is sent, so no
+        # API key is needed
+        client = TheOddsAPI('not-a-key')
+        with self.assertRaises(ValueError):
+            client.get_odds(sport='basketball_nba', regions='us', markets='player_points')
+        with self.assertRaises(ValueError):
+            client.get_event_odds(sport='basketball_nba', eventId='e1', regions='us',
+                                  markets='player_pass_tds')
+        with self.assertRaises(ValueError):
+            client.get_odds(sport='basketball_nba', regions='us', markets='h2hh')
+        markets.validate_markets('h2h,spreads')
+        # Event requests let markets missing from the registry through with
+        # a warning
+        with self.assertLogs('theoddsapi.markets', level='WARNING'):
+            markets.validate_markets('player_points_alternate', event=True,
+                                     sport='basketball_nba')
+        markets.validate_markets('alternate_spreads_h1,team_totals_q1', event=True)
+        markets.validate_markets('player_pass_tds', event=True, sport='aussierules_afl')
+        markets.validate_markets(['player_points', 'h2h_q1'], event=True, sport='basketball_nba')
+        assert markets.get_market('btts').category == markets.ADDITIONAL
+        print('Successfully validated markets...')
+
+
 if __name__ == '__main__':
 
     # Instantiate a client to get usage quota information after calls to tests
@@ -287,6 +539,34 @@ if __name__ == '__main__':
     usage_suite.addTest(TestGetUsageQuotas('test_get_requests_remaining'))
     usage_suite.addTest(TestGetUsageQuotas('test_get_requests_used'))
 
+    # TestOddsHub suite
+    hub_suite = unittest.TestSuite()
+    hub_suite.addTest(TestOddsHub('test_snapshot_on_connect'))
+    hub_suite.addTest(TestOddsHub('test_feeds_for_same_sport'))
+    hub_suite.addTest(TestOddsHub('test_validate_markets_opt_out'))
+    hub_suite.addTest(TestOddsHub('test_socket_path_in_use'))
+    hub_suite.addTest(TestOddsHub('test_stop_keeps_replaced_socket'))
+    hub_suite.addTest(TestOddsHub('test_publish_failure'))
+
+    # TestSnapshotStore suite
+    snapshots_suite = unittest.TestSuite()
+    snapshots_suite.addTest(TestSnapshotStore('test_reconstruct_snapshots'))
+
+    # TestExportCLI suite
+    cli_suite = unittest.TestSuite()
+    cli_suite.addTest(TestExportCLI('test_export_and_resume'))
+    cli_suite.addTest(TestExportCLI('test_resume_with_other_settings'))
+
+    # TestNormalizeArchive suite
+    archive_suite = unittest.TestSuite()
+    archive_suite.addTest(TestNormalizeArchive('test_normalize_archive'))
+
+    # TestMarketRegistry suite
+    markets_suite = unittest.TestSuite()
+    markets_suite.addTest(TestMarketRegistry('test_get_player_props'))
+    markets_suite.addTest(TestMarketRegistry('test_views_are_copies'))
+    markets_suite.addTest(TestMarketRegistry('test_validate_markets'))
+
     # Set up suite runner
     runner = unittest.TextTestRunner()
 
@@ -300,6 +580,11 @@ if __name__ == '__main__':
         'historical_odds': historical_odds_suite,
         'scores': scores_suite,
         'usage_quota': usage_suite,
+        'hub': hub_suite,
+        'snapshots': snapshots_suite,
+        'cli': cli_suite,
+        'archive': archive_suite,
+        'markets': markets_suite,
     }
     if args:
         for arg_suite in args: